@@ -6,14 +6,17 @@
 
 # camera_api.py
 import cv2
+import numpy as np
 import time
 import os
 import sys
 import logging
 from datetime import datetime
-from threading import Thread, Event, Lock
+from threading import Thread, Event, Lock, Semaphore
+from concurrent.futures import ThreadPoolExecutor
 from collections import deque
 import inspect
+import zlib
 
 # --- Logger ---
 class ClassNameFilter(logging.Filter):
@@ -73,20 +76,395 @@ class Logger:
 class CircularBuffer:
     def __init__(self, max_size=10):
         self.buffer = deque(maxlen=max_size)
+        self.stamps = deque(maxlen=max_size)  # monotonic capture time of each item
+        self.max_size = max_size
         self.lock = Lock()
         self.log = Logger()
-    def push(self, item):
+        self.pushed = 0
+        self.evicted = 0
+        self.high_water = 0
+    def push(self, item, stamp=None):
         with self.lock:
+            if len(self.buffer) == self.max_size:
+                self.evicted += 1  # oldest unread item is dropped by the deque
             self.buffer.append(item)
+            self.stamps.append(stamp if stamp is not None else time.monotonic())
+            self.pushed += 1
+            if len(self.buffer) > self.high_water:
+                self.high_water = len(self.buffer)
     def pop(self):
+        item = self.pop_stamped()
+        return item[0] if item else None
+    def pop_stamped(self):
+        """Pop (item, stamp), where stamp is the monotonic time given to push."""
         with self.lock:
-            return self.buffer.popleft() if self.buffer else None
+            if not self.buffer:
+                return None
+            return self.buffer.popleft(), self.stamps.popleft()
     def is_empty(self):
         with self.lock:
             return len(self.buffer) == 0
     def clear(self):
         with self.lock:
             self.buffer.clear()
+            self.stamps.clear()
+    def __len__(self):
+        with self.lock:
+            return len(self.buffer)
+    def oldest_age(self):
+        """Seconds the oldest unread item has waited; 0 when empty."""
+        with self.lock:
+            return time.monotonic() - self.stamps[0] if self.stamps else 0.0
+
+# --- Burst ---
+class Burst:
+    """Contiguous (N, H, W, C) block of frames with matching timestamps."""
+    def __init__(self, frames, timestamps):
+        self.frames = frames
+        self.timestamps = timestamps
+
+    def __len__(self):
+        return len(self.frames)
+
+    def _gray(self):
+        # (N, H, W) float32 luminance; grayscale bursts are already (N, H, W)
+        if self.frames.ndim == 4:
+            return self.frames.mean(axis=3, dtype=np.float32)
+        return self.frames.astype(np.float32)
+
+    def temporal_mean(self):
+        """Per-pixel mean over the burst (simple denoise)."""
+        mean = self.frames.mean(axis=0, dtype=np.float32)
+        return np.rint(mean).astype(self.frames.dtype)
+
+    def temporal_median(self):
+        """Per-pixel median over the burst (robust to moving outliers)."""
+        return np.median(self.frames, axis=0).astype(self.frames.dtype)
+
+    def brightness(self):
+        """Mean luminance of each frame, shape (N,)."""
+        return self._gray().mean(axis=(1, 2))
+
+    def sharpness(self):
+        """Variance of the Laplacian of each frame, shape (N,)."""
+        g = self._gray()
+        lap = (g[:, :-2, 1:-1] + g[:, 2:, 1:-1] + g[:, 1:-1, :-2] + g[:, 1:-1, 2:]
+               - 4.0 * g[:, 1:-1, 1:-1])
+        return lap.var(axis=(1, 2))
+
+    def best_frame(self, metric="sharpness"):
+        """Return (index, frame) of the frame scoring highest on metric."""
+        if metric == "sharpness":
+            scores = self.sharpness()
+        elif metric == "brightness":
+            scores = self.brightness()
+        else:
+            raise ValueError(f"Invalid metric: {metric}")
+        index = int(np.argmax(scores))
+        return index, self.frames[index]
+
+# --- Frame Stacker ---
+class FrameStacker:
+    """Integrate consecutive frames into one denoised output.
+
+    Frames are accumulated in place into a float32 buffer, either as a
+    running sum (mode="mean") or an exponential average (mode="ema"), so no
+    per-frame arrays are allocated. An output is emitted every `every`
+    frames and/or every `interval` seconds, whichever comes first.
+    """
+    MODES = ("mean", "ema")
+
+    def __init__(self, every=None, interval=None, mode="mean", alpha=0.1):
+        if not every and not interval:
+            raise ValueError("FrameStacker needs every and/or interval.")
+        if mode not in self.MODES:
+            raise ValueError(f"Invalid stacking mode: {mode}")
+        self.every = every
+        self.interval = interval
+        self.mode = mode
+        self.alpha = alpha
+        self.acc = None
+        self.scratch = None
+        self.dtype = None
+        self.count = 0
+        self.started = 0.0
+        self.emitted = 0
+
+    def reset(self):
+        self.acc = None
+        self.count = 0
+
+    def add(self, frame):
+        """Accumulate frame; return the stacked frame when one is due, else None."""
+        now = time.monotonic()
+        if self.acc is None or self.acc.shape != frame.shape:
+            self.acc = np.empty(frame.shape, dtype=np.float32)
+            self.scratch = np.empty_like(self.acc)
+            self.dtype = frame.dtype
+            self.count = 0
+            np.copyto(self.acc, frame)
+        elif self.mode == "ema":
+            # acc = (1 - alpha) * acc + alpha * frame, carried across outputs
+            np.multiply(frame, self.alpha, out=self.scratch)
+            np.multiply(self.acc, 1.0 - self.alpha, out=self.acc)
+            np.add(self.acc, self.scratch, out=self.acc)
+        elif self.count == 0:
+            np.copyto(self.acc, frame)
+        else:
+            np.add(self.acc, frame, out=self.acc)
+        if self.count == 0:
+            self.started = now
+        self.count += 1
+
+        if self.every and self.count >= self.every:
+            return self._emit()
+        if self.interval and now - self.started >= self.interval:
+            return self._emit()
+        return None
+
+    def _emit(self):
+        if self.mode == "mean":
+            np.multiply(self.acc, 1.0 / self.count, out=self.scratch)
+            np.rint(self.scratch, out=self.scratch)
+        else:
+            np.rint(self.acc, out=self.scratch)
+        self.count = 0
+        self.emitted += 1
+        return self.scratch.astype(self.dtype)
+
+# --- Frame Log ---
+class FrameLog:
+    """Columnar ring of per-frame metadata that outlives the pixel buffer.
+
+    Rows live in one preallocated NumPy structured array, so appending
+    never allocates and queries run vectorized over whole columns.
+    """
+    DTYPE = np.dtype([
+        ("seq", np.uint64),           # capture sequence number
+        ("t_mono", np.float64),       # time.monotonic() at capture
+        ("t_wall", np.float64),       # time.time() at capture
+        ("interval", np.float32),     # seconds since the previous frame
+        ("retries", np.uint16),       # failed reads before this frame
+        ("settings_rev", np.uint32),  # Settings.revision in effect
+        ("change", np.float32),       # sparse mean abs diff vs previous, 0..1
+        ("flags", np.uint8),
+    ])
+    FLAG_EVICTION = 1      # pushing this frame evicted an unread one
+    FLAG_NOT_BUFFERED = 2  # frame was consumed by the stacker or dropped
+    FLAG_DUPLICATE = 4     # backend returned the previous frame again
+    MAX_RETRIES = np.iinfo(np.uint16).max  # longer stalls are stored clamped
+
+    def __init__(self, capacity=65536):
+        self.capacity = capacity
+        self.data = np.zeros(capacity, dtype=self.DTYPE)
+        self.count = 0
+        self.lock = Lock()
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, seq, t_mono, t_wall, interval, retries, settings_rev, change, flags):
+        retries = min(retries, self.MAX_RETRIES)
+        with self.lock:
+            self.data[self.count % self.capacity] = (
+                seq, t_mono, t_wall, interval, retries, settings_rev, change, flags)
+            self.count += 1
+
+    def view(self):
+        """Copy of the stored rows in capture order."""
+        with self.lock:
+            if self.count <= self.capacity:
+                return self.data[:self.count].copy()
+            i = self.count % self.capacity
+            return np.concatenate((self.data[i:], self.data[:i]))
+
+    def gaps(self, min_ms):
+        """Rows whose interval to the previous frame exceeds min_ms."""
+        rows = self.view()
+        return rows[rows["interval"] * 1000.0 > min_ms]
+
+    def fps(self, window=1.0, unique=True):
+        """Frame rate over the last `window` seconds, by default of unique frames."""
+        rows = self.view()
+        if unique:
+            rows = rows[(rows["flags"] & self.FLAG_DUPLICATE) == 0]
+        t = rows["t_mono"]
+        if len(t) < 2:
+            return 0.0
+        recent = t[t >= t[-1] - window]
+        span = recent[-1] - recent[0]
+        return (len(recent) - 1) / span if span > 0 else 0.0
+
+    def to_csv(self, path):
+        rows = self.view()
+        fmt = ["%d", "%.6f", "%.6f", "%.6f", "%d", "%d", "%.4f", "%d"]
+        np.savetxt(path, rows, fmt=fmt, delimiter=",",
+                   header=",".join(self.DTYPE.names), comments="")
+
+    def save(self, path):
+        """Write rows as a typed .npy file (load back with np.load)."""
+        np.save(path, self.view())
+
+# --- Callbacks ---
+class FrameCallback:
+    """A registered frame callback with its dispatch policy and timing stats."""
+    MODES = ("inline", "thread", "pool")
+    HISTOGRAM_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+    def __init__(self, fn, mode="thread", max_in_flight=1, drop_if_busy=True, name=None):
+        if mode not in self.MODES:
+            raise ValueError(f"Invalid dispatch mode: {mode}")
+        self.fn = fn
+        self.mode = mode
+        self.max_in_flight = max_in_flight
+        self.drop_if_busy = drop_if_busy
+        self.name = name or getattr(fn, "__name__", repr(fn))
+        self.slots = Semaphore(max_in_flight)
+        self.executor = None
+        self.removed = False
+        self.lock = Lock()
+        self.calls = 0
+        self.dropped = 0
+        self.errors = 0
+        self.slow = 0
+        self.total_time = 0.0
+        self.histogram = [0] * (len(self.HISTOGRAM_BOUNDS_MS) + 1)  # last bucket is +Inf
+
+    def record(self, elapsed):
+        ms = elapsed * 1000.0
+        bucket = len(self.HISTOGRAM_BOUNDS_MS)
+        for i, bound in enumerate(self.HISTOGRAM_BOUNDS_MS):
+            if ms <= bound:
+                bucket = i
+                break
+        with self.lock:
+            self.calls += 1
+            self.total_time += elapsed
+            self.histogram[bucket] += 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                "name": self.name,
+                "mode": self.mode,
+                "calls": self.calls,
+                "dropped": self.dropped,
+                "errors": self.errors,
+                "slow": self.slow,
+                "mean_ms": self.total_time * 1000.0 / self.calls if self.calls else 0.0,
+                "histogram_ms": dict(zip(self.HISTOGRAM_BOUNDS_MS + ("inf",), self.histogram)),
+            }
+
+class CallbackRegistry:
+    """Dispatch each frame to registered callbacks without stalling capture.
+
+    "inline" runs on the capture thread, "thread" on a dedicated worker and
+    "pool" on a shared pool. Off-thread callbacks hold at most max_in_flight
+    frames; when full, the frame is dropped for that callback
+    (drop_if_busy=True) or capture waits for a slot.
+    """
+    def __init__(self, pool_workers=4):
+        self.callbacks = []
+        self.retired = []  # removed callbacks whose executors close on shutdown()
+        self.lock = Lock()
+        self.pool = None
+        self.pool_workers = pool_workers
+        self.frame_budget = None  # seconds; slower calls are logged
+        self.log = Logger()
+
+    def add(self, fn, mode="thread", max_in_flight=1, drop_if_busy=True, name=None):
+        callback = FrameCallback(fn, mode, max_in_flight, drop_if_busy, name)
+        with self.lock:
+            # Copy on write so dispatch can iterate without the lock
+            self.callbacks = self.callbacks + [callback]
+        self.log.info(f"Callback {callback.name} added ({mode}).")
+        return callback
+
+    def remove(self, callback):
+        """Remove a FrameCallback, or every callback registered for a function."""
+        with self.lock:
+            removed = [c for c in self.callbacks if c is callback or c.fn == callback]
+            self.callbacks = [c for c in self.callbacks if c not in removed]
+            # The capture thread may still hold the old list and submit to these
+            # executors, so they are only shut down once capture has stopped
+            for c in removed:
+                c.removed = True
+            self.retired.extend(removed)
+
+    def dispatch(self, frame, fps):
+        for callback in self.callbacks:
+            if callback.removed:
+                continue
+            if callback.mode == "inline":
+                self._run(callback, frame, fps)
+            elif callback.slots.acquire(blocking=not callback.drop_if_busy):
+                try:
+                    self._executor(callback).submit(self._run_async, callback, frame, fps)
+                except RuntimeError:
+                    # Executor already shut down; never let that end capture
+                    callback.slots.release()
+                    with callback.lock:
+                        callback.dropped += 1
+            else:
+                with callback.lock:
+                    callback.dropped += 1
+
+    def _executor(self, callback):
+        if callback.executor is None:
+            if callback.mode == "thread":
+                callback.executor = ThreadPoolExecutor(max_workers=1,
+                                                       thread_name_prefix=callback.name)
+            else:
+                if self.pool is None:
+                    self.pool = ThreadPoolExecutor(max_workers=self.pool_workers,
+                                                   thread_name_prefix="frame-callback")
+                callback.executor = self.pool
+        return callback.executor
+
+    def _run_async(self, callback, frame, fps):
+        try:
+            self._run(callback, frame, fps)
+        finally:
+            callback.slots.release()
+
+    def _run(self, callback, frame, fps):
+        start = time.perf_counter()
+        try:
+            callback.fn(frame, fps)
+        except Exception as e:
+            with callback.lock:
+                callback.errors += 1
+                errors = callback.errors
+            if errors == 1 or errors % 100 == 0:  # rate-limited like slow warnings
+                self.log.error(f"Callback {callback.name} failed ({errors} times): {e}")
+        elapsed = time.perf_counter() - start
+        callback.record(elapsed)
+        budget = self.frame_budget
+        if budget and elapsed > budget:
+            with callback.lock:
+                callback.slow += 1
+                slow = callback.slow
+            if slow == 1 or slow % 100 == 0:  # rate-limited warning
+                self.log.warning(
+                    f"Callback {callback.name} took {elapsed * 1000:.1f} ms, over the "
+                    f"{budget * 1000:.1f} ms frame budget ({slow} times)."
+                )
+
+    def stats(self):
+        return [c.stats() for c in self.callbacks]
+
+    def shutdown(self):
+        """Close all executors; call only after capture has stopped."""
+        with self.lock:
+            callbacks = self.callbacks + self.retired
+            self.retired = []
+        for callback in callbacks:
+            if callback.mode == "thread" and callback.executor:
+                callback.executor.shutdown(wait=True)
+            callback.executor = None
+        if self.pool:
+            self.pool.shutdown(wait=True)
+            self.pool = None
 
 # --- Settings ---
 class Settings:
@@ -121,6 +499,7 @@ class Settings:
     def __init__(self, camera):
         self.camera = camera
         self._values = self.DEFAULTS.copy()
+        self.revision = 0
 
     def get(self, name):
         return self._values.get(name)
@@ -130,29 +509,192 @@ class Settings:
             raise ValueError(f"Invalid setting: {name}")
         self._values[name] = value
 
-    def apply(self):
-        """Apply all current settings to the camera."""
+    def apply(self, names=None):
+        """Apply current settings (all, or only names) to the camera."""
         if not self.camera.cap or not self.camera.cap.isOpened():
             self.camera.log.warning("Camera not opened; cannot apply settings.")
             return
-        for name, value in self._values.items():
-            prop = self.AVAILABLE_PROPERTIES[name]
-            success = self.camera.cap.set(prop, value)
-            self.camera.log.info(f"Set {name}={value} success={success}")
+        names = names if names is not None else list(self._values)
+        # Hold the capture lock so a live stream never reads mid-reconfigure
+        with self.camera.cap_lock:
+            for name in names:
+                value = self._values[name]
+                prop = self.AVAILABLE_PROPERTIES[name]
+                success = self.camera.cap.set(prop, value)
+                self.camera.log.info(f"Set {name}={value} success={success}")
+            self.revision += 1
 
     def available(self):
         return list(self.AVAILABLE_PROPERTIES.keys())
 
+# --- Adaptive Controller ---
+class AdaptiveController:
+    """Step capture down under consumer backpressure and back up with headroom.
+
+    Every interval the buffer fill ratio, eviction rate and consumer lag
+    (age of the oldest unread frame) are sampled. Sustained pressure moves
+    one level down the ladder (fps first, then resolution); sustained
+    headroom moves one level up. Stepping up needs more consecutive samples
+    than stepping down, and a cooldown follows every change, so the
+    controller does not oscillate.
+    """
+    def __init__(self, camera, levels=None, interval=1.0, high_water=0.75,
+                 low_water=0.25, max_drop_rate=0.0, max_lag=0.5, down_after=2,
+                 up_after=5, cooldown=2):
+        self.camera = camera
+        self.levels = levels
+        self._user_levels = levels is not None
+        self._applied = None  # degraded values this controller left in Settings
+        self.interval = interval
+        self.high_water = high_water
+        self.low_water = low_water
+        self.max_drop_rate = max_drop_rate
+        self.max_lag = max_lag
+        self.down_after = down_after
+        self.up_after = up_after
+        self.cooldown = cooldown
+        self.level = 0
+        self.decisions = 0
+        self.history = deque(maxlen=64)
+        self.last_fill = 0.0
+        self.last_drop_rate = 0.0
+        self.last_lag = 0.0
+        self._pressure = 0
+        self._headroom = 0
+        self._hold = 0
+        self.thread = None
+        self.stop_event = Event()
+        self.log = Logger()
+
+    @staticmethod
+    def default_levels(width, height, fps):
+        return [
+            {"width": width, "height": height, "fps": fps},
+            {"width": width, "height": height, "fps": fps / 2},
+            {"width": width // 2, "height": height // 2, "fps": fps / 2},
+            {"width": width // 2, "height": height // 2, "fps": fps / 4},
+        ]
+
+    def start(self):
+        if self.thread:
+            return
+        settings = self.camera.settings
+        # Undo a degraded level left by a previous run, unless the user has
+        # changed those settings since
+        if self._applied is not None:
+            if all(settings.get(name) == value for name, value in self._applied.items()):
+                self._apply(self.levels[0])
+                self.log.info(f"Adaptive level reset to 0: {self.levels[0]}")
+            self._applied = None
+        if not self._user_levels:
+            self.levels = self.default_levels(settings.get("width"), settings.get("height"),
+                                              settings.get("fps"))
+        self.level = 0
+        self._pressure = self._headroom = self._hold = 0
+        self.stop_event.clear()
+        self.thread = Thread(target=self._control_loop, daemon=True)
+        self.thread.start()
+        self.log.info(f"Adaptive control started with {len(self.levels)} levels.")
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def _control_loop(self):
+        buffer = self.camera.get_buffer()
+        pushed, evicted = buffer.pushed, buffer.evicted
+        while not self.stop_event.wait(self.interval):
+            d_pushed = buffer.pushed - pushed
+            d_evicted = buffer.evicted - evicted
+            pushed, evicted = buffer.pushed, buffer.evicted
+            fill = len(buffer) / buffer.max_size
+            drop_rate = d_evicted / d_pushed if d_pushed else 0.0
+            self.step(fill, drop_rate, buffer.oldest_age())
+
+    def step(self, fill, drop_rate, lag):
+        """Feed one sample; change level when pressure or headroom is sustained."""
+        self.last_fill = fill
+        self.last_drop_rate = drop_rate
+        self.last_lag = lag
+        if self._hold:
+            self._hold -= 1
+            return
+        if drop_rate > self.max_drop_rate or fill >= self.high_water or lag > self.max_lag:
+            self._pressure, self._headroom = self._pressure + 1, 0
+        elif drop_rate == 0 and fill <= self.low_water and lag <= self.max_lag / 2:
+            self._pressure, self._headroom = 0, self._headroom + 1
+        else:
+            self._pressure = self._headroom = 0
+
+        if self._pressure >= self.down_after and self.level < len(self.levels) - 1:
+            self._set_level(self.level + 1, "pressure")
+        elif self._headroom >= self.up_after and self.level > 0:
+            self._set_level(self.level - 1, "headroom")
+        else:
+            return
+        self._pressure = self._headroom = 0
+        self._hold = self.cooldown
+
+    def _apply(self, values):
+        for name, value in values.items():
+            self.camera.settings.set(name, value)
+        self.camera.settings.apply(names=list(values))
+
+    def _set_level(self, level, reason):
+        previous = self.level
+        values = self.levels[level]
+        self._apply(values)
+        self._applied = values if level > 0 else None
+        self.level = level
+        self.decisions += 1
+        self.history.append((time.time(), previous, level, reason))
+        self.log.info(
+            f"Adaptive level {previous}->{level} ({reason}): {values} "
+            f"fill={self.last_fill:.2f} drop_rate={self.last_drop_rate:.2f} "
+            f"lag={self.last_lag:.3f}s"
+        )
+
+    def stats(self):
+        return {
+            "level": self.level,
+            "decisions": self.decisions,
+            "fill": self.last_fill,
+            "drop_rate": self.last_drop_rate,
+            "lag": self.last_lag,
+        }
+
 # --- CameraAPI ---
 class CameraAPI:
-    def __init__(self, buffer=None):
+    CHANGE_SAMPLE_STEP = 16  # pixel stride used for the change score
+    DEDUP_SAMPLE_STEP = 8    # pixel stride hashed for duplicate detection
+    DEDUP_EARLY_FRACTION = 0.5  # hash matches count only if this early vs 1/fps
+    DEDUP_MODES = ("off", "mark", "drop")
+
+    def __init__(self, buffer=None, frame_log=None, dedup="mark"):
+        if dedup not in self.DEDUP_MODES:
+            raise ValueError(f"Invalid dedup mode: {dedup}")
         self.cap = None
         self.streaming = False
         self.thread = None
         self.stop_event = Event()
-        self.buffer = buffer if buffer else CircularBuffer(max_size=128)
+        self.cap_lock = Lock()
+        self.buffer = buffer if buffer is not None else CircularBuffer(max_size=128)
+        self.frame_log = frame_log if frame_log is not None else FrameLog()
+        self.callbacks = CallbackRegistry()
+        self._prev_sample = None
+        self.dedup = dedup
+        self._prev_backend_ts = None
+        self._prev_digest = None
+        self._prev_read_time = None
         self.log = Logger()
         self.settings = Settings(self)
+        self.frames_captured = 0
+        self.read_failures = 0
+        self.duplicates = 0
+        self.frame_log_errors = 0
+        self.stacker = None
 
     def open_camera(self, index=0):
         self.cap = cv2.VideoCapture(index)
@@ -167,6 +709,7 @@ class CameraAPI:
 
     def close_camera(self):
         self.stop_streaming()
+        self.callbacks.shutdown()
         if self.cap:
             self.cap.release()
             self.cap = None
@@ -180,6 +723,8 @@ class CameraAPI:
             return
         # Apply settings before streaming
         self.settings.apply()
+        fps = self.settings.get("fps")
+        self.callbacks.frame_budget = 1.0 / fps if fps else None
 
         self.streaming = True
         self.stop_event.clear()
@@ -189,23 +734,172 @@ class CameraAPI:
 
     def _stream_loop(self):
         prev_time = time.time()
+        prev_mono = time.monotonic()
+        fps = 0.0
+        retries = 0
+        self._prev_sample = None
+        self._prev_backend_ts = None
+        self._prev_digest = None
+        self._prev_read_time = None
         while not self.stop_event.is_set():
-            ret, frame = self.cap.read()
+            with self.cap_lock:
+                ret, frame = self.cap.read()
+                backend_ts = self.cap.get(cv2.CAP_PROP_POS_MSEC) if ret and self.dedup != "off" else 0.0
             if not ret:
+                self.read_failures += 1
+                retries += 1
                 continue
-            current_time = time.time()
-            fps = 1.0 / (current_time - prev_time)
-            prev_time = current_time
-            self.buffer.push((frame, fps))
+            self.frames_captured += 1
+            now = time.monotonic()
+            flags = 0
+            duplicate = self.dedup != "off" and self._is_duplicate(frame, backend_ts, now)
+            if duplicate:
+                self.duplicates += 1
+                flags |= FrameLog.FLAG_DUPLICATE
+            change = self._change_score(frame)
+            if duplicate and self.dedup == "drop":
+                frame = None
+            elif self.stacker:
+                # Time-lapse: only integrated outputs reach the buffer
+                frame = self.stacker.add(frame)
+            if frame is None:
+                flags |= FrameLog.FLAG_NOT_BUFFERED
+            else:
+                if not duplicate:
+                    # fps counts unique frames only; marked duplicates reuse it
+                    current_time = time.time()
+                    fps = 1.0 / (current_time - prev_time)
+                    prev_time = current_time
+                evicted = self.buffer.evicted
+                self.buffer.push((frame, fps), stamp=now)
+                if self.buffer.evicted != evicted:
+                    flags |= FrameLog.FLAG_EVICTION
+                self.callbacks.dispatch(frame, fps)
+            try:
+                self.frame_log.append(self.frames_captured, now, time.time(), now - prev_mono,
+                                      retries, self.settings.revision, change, flags)
+            except Exception as e:
+                # Metadata must never stop capture
+                self.frame_log_errors += 1
+                if self.frame_log_errors == 1 or self.frame_log_errors % 100 == 0:
+                    self.log.error(f"Frame log append failed ({self.frame_log_errors} times): {e}")
+            prev_mono = now
+            retries = 0
         self.streaming = False
         self.log.info("Streaming stopped.")
 
+    def _is_duplicate(self, frame, backend_ts, now):
+        """Detect a re-delivered frame by backend timestamp, else by a sparse-sample hash.
+
+        Without a backend timestamp, identical pixels alone are not enough: a
+        static dark or saturated scene hashes the same every frame. A hash
+        match is only a duplicate when the read also returned well before the
+        configured frame interval, which is how cached re-deliveries behave.
+        A driver that repeats frames at the full frame rate is not detected.
+        """
+        prev_read, self._prev_read_time = self._prev_read_time, now
+        if backend_ts > 0:
+            duplicate = backend_ts == self._prev_backend_ts
+            self._prev_backend_ts = backend_ts
+            return duplicate
+        step = self.DEDUP_SAMPLE_STEP
+        digest = zlib.crc32(np.ascontiguousarray(frame[::step, ::step]))
+        duplicate = digest == self._prev_digest
+        self._prev_digest = digest
+        if not duplicate or prev_read is None:
+            return False
+        fps = self.settings.get("fps")
+        if not fps:
+            return True
+        return now - prev_read < self.DEDUP_EARLY_FRACTION / fps
+
+    def _change_score(self, frame):
+        """Mean abs difference to the previous frame on a sparse pixel grid, 0..1."""
+        step = self.CHANGE_SAMPLE_STEP
+        sample = frame[::step, ::step].astype(np.int16)
+        prev, self._prev_sample = self._prev_sample, sample
+        if prev is None or prev.shape != sample.shape:
+            return 0.0
+        return float(np.abs(sample - prev).mean()) / 255.0
+
     def stop_streaming(self):
         if self.streaming:
             self.stop_event.set()
             if self.thread:
                 self.thread.join()
             self.thread = None
+        self.stacker = None
+
+    def start_timelapse(self, every=None, interval=None, mode="mean", alpha=0.1):
+        """Stream one stacked frame per `every` frames and/or `interval` seconds."""
+        if not self.cap:
+            raise RuntimeError("Camera not opened.")
+        if self.streaming:
+            self.log.info("Already streaming.")
+            return
+        self.stacker = FrameStacker(every=every, interval=interval, mode=mode, alpha=alpha)
+        self.log.info(f"Time-lapse: every={every} interval={interval} mode={mode}")
+        self.start_streaming()
+
+    def add_callback(self, fn, mode="thread", max_in_flight=1, drop_if_busy=True, name=None):
+        """Register fn(frame, fps) for every buffered frame; see CallbackRegistry."""
+        return self.callbacks.add(fn, mode, max_in_flight, drop_if_busy, name)
+
+    def remove_callback(self, callback):
+        self.callbacks.remove(callback)
+
+    def capture_burst(self, num_frames=10, timeout=5.0, fresh=True):
+        """Capture num_frames into one preallocated (N, H, W, C) block.
+
+        Timestamps are wall-clock capture times. While streaming, frames are
+        pulled from the buffer instead of the camera, so the stream thread
+        stays the only reader of cap; with fresh=True, frames that were
+        already buffered before the call are discarded rather than used.
+        Popping consumes those frames: any other reader of the same buffer
+        (the Qt FrameConsumer, the CLI drain loop) misses them for the
+        duration of the burst.
+        """
+        if not self.cap:
+            raise RuntimeError("Camera not opened.")
+        frames = None
+        timestamps = np.empty(num_frames, dtype=np.float64)
+        count = 0
+        start = time.monotonic()
+        deadline = start + timeout
+        while count < num_frames and time.monotonic() < deadline:
+            frame, timestamp = self._next_burst_frame(start if fresh else None)
+            if frame is None:
+                continue
+            if frames is None:
+                frames = np.empty((num_frames,) + frame.shape, dtype=frame.dtype)
+            elif frame.shape != frames.shape[1:]:
+                self.log.warning(f"Skipping frame with shape {frame.shape} in burst.")
+                continue
+            frames[count] = frame
+            timestamps[count] = timestamp
+            count += 1
+        if frames is None:
+            raise RuntimeError("No frames captured.")
+        if count < num_frames:
+            self.log.warning(f"Burst timed out after {count}/{num_frames} frames.")
+        self.log.info(f"Captured burst of {count} frames.")
+        return Burst(frames[:count], timestamps[:count])
+
+    def _next_burst_frame(self, since=None):
+        """Return (frame, wall-clock capture time), or (None, None)."""
+        if self.streaming:
+            item = self.buffer.pop_stamped()
+            if item is None:
+                time.sleep(0.005)  # avoid busy waiting on an empty buffer
+                return None, None
+            (frame, _fps), stamp = item
+            if since is not None and stamp < since:
+                return None, None  # stale backlog frame
+            # Buffer stamps are monotonic; convert to wall clock
+            return frame, time.time() - (time.monotonic() - stamp)
+        with self.cap_lock:
+            ret, frame = self.cap.read()
+        return (frame, time.time()) if ret else (None, None)
 
     def get_buffer(self):
         return self.buffer
\ No newline at end of file
@@ -100,6 +100,28 @@ class CameraApp(QWidget):
         self.consumer = FrameConsumer(self.buffer)
         self.consumer.frame_ready.connect(self.display_frame)
         self.last_frame = None
+        self.frames_displayed = 0
+
+        # --- Metrics (set CAMERA_METRICS_PORT to expose /metrics) ---
+        self.metrics_server = None
+        try:
+            metrics_port = int(os.environ.get("CAMERA_METRICS_PORT", "0"))
+        except ValueError:
+            self.log.error("Invalid CAMERA_METRICS_PORT; metrics disabled.")
+            metrics_port = 0
+        if metrics_port:
+            from camera_metrics import Metrics, MetricsServer
+            metrics = Metrics()
+            metrics.watch_camera(self.camera)
+            metrics.watch_process()
+            metrics.add_counter("camera_frames_displayed_total", "Frames shown in the viewer.",
+                                lambda: self.frames_displayed)
+            self.metrics_server = MetricsServer(metrics, port=metrics_port)
+            try:
+                self.metrics_server.start()
+            except OSError as e:
+                self.log.error(f"Cannot start metrics server: {e}")
+                self.metrics_server = None
 
         # --- Button connections ---
         self.start_button.clicked.connect(self.on_start_button)
@@ -184,7 +206,16 @@ class CameraApp(QWidget):
         self.fps_label.setText("FPS: 0.00")
         self.log.info("Camera stopped.")
 
+    def closeEvent(self, event):
+        if self.camera.streaming:
+            self.stop_camera()
+        if self.metrics_server:
+            self.metrics_server.stop()
+            self.metrics_server = None
+        super().closeEvent(event)
+
     def display_frame(self, frame, fps):
+        self.frames_displayed += 1
         self.last_frame = frame.copy()
         overlay = frame.copy()
         #text = f"FPS: {fps:.2f}"
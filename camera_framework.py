@@ -0,0 +1,418 @@
+# camera_framework.py
+
+# Headless entry point:
+#   python3 -m camera_framework snapshot out.png
+#   python3 -m camera_framework record out.avi --duration 10
+# cv2 and camera_api_2 are imported inside each command so that
+# argument parsing and --help never pay for them, and Qt is never imported.
+
+import argparse
+import signal
+import sys
+import time
+from threading import Event
+
+
+def _open_camera(args, buffer_size=128):
+    from camera_api_2 import CameraAPI, CircularBuffer
+
+    camera = CameraAPI(CircularBuffer(max_size=buffer_size),
+                       dedup=getattr(args, "dedup", "mark"))
+    if args.width:
+        camera.settings.set("width", args.width)
+    if args.height:
+        camera.settings.set("height", args.height)
+    if args.fps:
+        camera.settings.set("fps", args.fps)
+    camera.open_camera(index=args.index)
+    return camera
+
+
+def _non_negative_int(value):
+    """argparse type for counts that may be zero but not negative."""
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must be >= 0, got {number}")
+    return number
+
+
+def _install_signal_handlers(stop_event):
+    """Set stop_event on SIGINT/SIGTERM so loops can shut down cleanly."""
+    def handler(signum, _frame):
+        stop_event.set()
+    signal.signal(signal.SIGINT, handler)
+    signal.signal(signal.SIGTERM, handler)
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, handler)
+
+
+def _start_adaptive(camera, args):
+    """Start an AdaptiveController when --adaptive was given."""
+    if not getattr(args, "adaptive", False):
+        return None
+    from camera_api_2 import AdaptiveController
+
+    controller = AdaptiveController(camera)
+    controller.start()
+    return controller
+
+
+def _start_metrics(camera, args, controller=None, register=None):
+    """Start the metrics endpoint and/or snapshot writer that were requested."""
+    if not (args.metrics_port or args.metrics_file):
+        return []
+    from camera_metrics import Metrics, MetricsServer, SnapshotWriter
+
+    metrics = Metrics()
+    metrics.watch_camera(camera)
+    metrics.watch_process()
+    if controller:
+        metrics.watch_adaptive(controller)
+    if register:
+        register(metrics)
+    exporters = []
+    if args.metrics_port:
+        exporters.append(MetricsServer(metrics, port=args.metrics_port))
+    if args.metrics_file:
+        exporters.append(SnapshotWriter(metrics, args.metrics_file, args.metrics_interval))
+    for exporter in exporters:
+        exporter.start()
+    return exporters
+
+
+def _save_frame_log(camera, args):
+    """Export per-frame metadata to --frame-log (.npy keeps types, else CSV)."""
+    if not args.frame_log:
+        return
+    if args.frame_log.endswith(".npy"):
+        camera.frame_log.save(args.frame_log)
+    else:
+        camera.frame_log.to_csv(args.frame_log)
+    camera.log.info(f"Frame log saved to {args.frame_log}")
+
+
+def _drain(camera, stop_event, duration, on_frame):
+    """Pop frames from the camera buffer until stopped or duration elapses."""
+    deadline = time.monotonic() + duration if duration else None
+    buffer = camera.get_buffer()
+    while not stop_event.is_set():
+        if deadline and time.monotonic() >= deadline:
+            break
+        item = buffer.pop()
+        if item is None:
+            time.sleep(0.005)  # avoid busy waiting
+            continue
+        on_frame(*item)
+
+
+# --- Commands ---
+def cmd_probe(args):
+    import cv2
+
+    cap = cv2.VideoCapture(args.index)
+    if not cap.isOpened():
+        print(f"Cannot open camera {args.index}", file=sys.stderr)
+        return 1
+    # Report what the driver actually grants for the requested mode
+    if args.width:
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, args.width)
+    if args.height:
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, args.height)
+    if args.fps:
+        cap.set(cv2.CAP_PROP_FPS, args.fps)
+    props = {
+        "width": cv2.CAP_PROP_FRAME_WIDTH,
+        "height": cv2.CAP_PROP_FRAME_HEIGHT,
+        "fps": cv2.CAP_PROP_FPS,
+        "fourcc": cv2.CAP_PROP_FOURCC,
+        "backend": None,
+    }
+    for name, prop in props.items():
+        value = cap.getBackendName() if prop is None else cap.get(prop)
+        print(f"{name}: {value}")
+    cap.release()
+    return 0
+
+
+def cmd_snapshot(args):
+    import cv2
+
+    camera = _open_camera(args)
+    try:
+        # Let auto exposure settle before keeping a frame
+        for _ in range(args.warmup + 1):
+            ret, frame = camera.cap.read()
+        if not ret:
+            print("Failed to read frame", file=sys.stderr)
+            return 1
+        cv2.imwrite(args.output, frame)
+        print(f"Saved frame to {args.output}")
+    finally:
+        camera.close_camera()
+    return 0
+
+
+def cmd_stream(args):
+    stop_event = Event()
+    _install_signal_handlers(stop_event)
+    camera = _open_camera(args)
+    frames = 0
+    last_report = time.monotonic()
+
+    def on_frame(frame, fps):
+        nonlocal frames, last_report
+        frames += 1
+        now = time.monotonic()
+        if now - last_report >= args.report_interval:
+            camera.log.info(f"frames={frames} fps={fps:.2f}")
+            last_report = now
+
+    controller = None
+    exporters = []
+    try:
+        camera.start_streaming()
+        controller = _start_adaptive(camera, args)
+        exporters = _start_metrics(camera, args, controller)
+        _drain(camera, stop_event, args.duration, on_frame)
+    finally:
+        if controller:
+            controller.stop()
+        camera.close_camera()
+        for exporter in exporters:
+            exporter.stop()
+        _save_frame_log(camera, args)
+    return 0
+
+
+def cmd_record(args):
+    import cv2
+
+    stop_event = Event()
+    _install_signal_handlers(stop_event)
+    camera = _open_camera(args)
+    writer = None
+    written = 0
+
+    def on_frame(frame, fps):
+        nonlocal writer, written
+        if writer is None:
+            h, w = frame.shape[:2]
+            fourcc = cv2.VideoWriter_fourcc(*args.codec)
+            out_fps = args.output_fps or args.fps or camera.settings.get("fps")
+            writer = cv2.VideoWriter(args.output, fourcc, out_fps, (w, h))
+            if not writer.isOpened():
+                raise RuntimeError(f"Cannot open writer for {args.output}")
+        writer.write(frame)
+        written += 1
+
+    def register(metrics):
+        # The camera buffer is the writer's queue in record mode
+        metrics.add_gauge("camera_write_queue_depth", "Frames waiting for the video writer.",
+                          lambda: len(camera.get_buffer()))
+        metrics.add_counter("camera_frames_written_total", "Frames written to the video file.",
+                            lambda: written)
+
+    exporters = []
+    try:
+        if args.stack or args.stack_interval:
+            camera.start_timelapse(every=args.stack, interval=args.stack_interval,
+                                   mode=args.stack_mode, alpha=args.stack_alpha)
+        else:
+            camera.start_streaming()
+        exporters = _start_metrics(camera, args, register=register)
+        _drain(camera, stop_event, args.duration, on_frame)
+    finally:
+        # Stop capture first, then flush whatever is still buffered
+        camera.stop_streaming()
+        item = camera.get_buffer().pop()
+        while item is not None and writer is not None:
+            writer.write(item[0])
+            item = camera.get_buffer().pop()
+        if writer is not None:
+            writer.release()
+            camera.log.info(f"Recording saved to {args.output}")
+        camera.close_camera()
+        for exporter in exporters:
+            exporter.stop()
+        _save_frame_log(camera, args)
+    return 0
+
+
+def cmd_serve(args):
+    import cv2
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from threading import Lock, Thread
+
+    stop_event = Event()
+    _install_signal_handlers(stop_event)
+    camera = _open_camera(args, buffer_size=4)
+    latest = {"jpeg": None}
+    latest_lock = Lock()
+
+    def on_frame(frame, fps):
+        ok, jpeg = cv2.imencode(".jpg", frame)
+        if ok:
+            with latest_lock:
+                latest["jpeg"] = jpeg.tobytes()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/snapshot.jpg":
+                self.send_error(404)
+                return
+            with latest_lock:
+                body = latest["jpeg"]
+            if body is None:
+                self.send_error(503, "No frame yet")
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = None
+    server_thread = None
+    controller = None
+    exporters = []
+    try:
+        # Bind inside the try so a busy port still releases the camera
+        server = ThreadingHTTPServer((args.host, args.port), Handler)
+        server_thread = Thread(target=server.serve_forever, daemon=True)
+        camera.start_streaming()
+        controller = _start_adaptive(camera, args)
+        exporters = _start_metrics(camera, args, controller)
+        server_thread.start()
+        camera.log.info(f"Serving http://{args.host}:{args.port}/snapshot.jpg")
+        _drain(camera, stop_event, args.duration, on_frame)
+    finally:
+        # shutdown() blocks forever unless serve_forever() is running
+        if server_thread is not None and server_thread.is_alive():
+            server.shutdown()
+        if server is not None:
+            server.server_close()
+        if controller:
+            controller.stop()
+        camera.close_camera()
+        for exporter in exporters:
+            exporter.stop()
+        _save_frame_log(camera, args)
+    return 0
+
+
+def cmd_bench(args):
+    stop_event = Event()
+    _install_signal_handlers(stop_event)
+    camera = _open_camera(args)
+
+    def on_frame(frame, fps):
+        pass
+
+    try:
+        camera.start_streaming()
+        _drain(camera, stop_event, args.duration, on_frame)
+    finally:
+        camera.close_camera()
+        _save_frame_log(camera, args)
+    # Capture-side timing of unique frames comes from the frame log
+    rows = camera.frame_log.view()
+    unique = rows[(rows["flags"] & camera.frame_log.FLAG_DUPLICATE) == 0]
+    intervals = unique["t_mono"][1:] - unique["t_mono"][:-1]
+    if len(intervals) < 1:
+        print("Not enough frames for a benchmark", file=sys.stderr)
+        return 1
+    mean = float(intervals.mean())
+    print(f"frames: {len(intervals) + 1}")
+    print(f"fps: {1.0 / mean:.2f}")
+    print(f"interval_ms: mean={mean * 1000:.2f} jitter={intervals.std() * 1000:.2f} "
+          f"max={intervals.max() * 1000:.2f}")
+    print(f"gaps over 2x mean: {len(camera.frame_log.gaps(2000 * mean))}")
+    print(f"duplicates: {camera.duplicates}")
+    return 0
+
+
+# --- CLI ---
+def build_parser():
+    parser = argparse.ArgumentParser(prog="camera_framework",
+                                     description="Headless camera framework.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    camera_args = argparse.ArgumentParser(add_help=False)
+    camera_args.add_argument("--index", type=int, default=0, help="camera index")
+    camera_args.add_argument("--width", type=int)
+    camera_args.add_argument("--height", type=int)
+    camera_args.add_argument("--fps", type=float)
+
+    duration_args = argparse.ArgumentParser(add_help=False)
+    duration_args.add_argument("--duration", type=float, default=0,
+                               help="seconds to run; 0 runs until SIGINT/SIGTERM")
+    duration_args.add_argument("--dedup", choices=["off", "mark", "drop"], default="mark",
+                               help="handle frames the backend delivers twice")
+    duration_args.add_argument("--frame-log",
+                               help="on exit, export per-frame metadata (.csv, or .npy)")
+
+    adaptive_args = argparse.ArgumentParser(add_help=False)
+    adaptive_args.add_argument("--adaptive", action="store_true",
+                               help="step fps/resolution down when consumers fall behind")
+
+    metrics_args = argparse.ArgumentParser(add_help=False)
+    metrics_args.add_argument("--metrics-port", type=int, default=0,
+                              help="serve Prometheus metrics on this local port")
+    metrics_args.add_argument("--metrics-file", help="write periodic JSON snapshots here")
+    metrics_args.add_argument("--metrics-interval", type=float, default=10.0,
+                              help="seconds between JSON snapshots")
+
+    p = sub.add_parser("probe", parents=[camera_args], help="print camera properties")
+    p.set_defaults(func=cmd_probe)
+
+    p = sub.add_parser("snapshot", parents=[camera_args], help="save a single frame")
+    p.add_argument("output")
+    p.add_argument("--warmup", type=_non_negative_int, default=5, help="frames to discard first")
+    p.set_defaults(func=cmd_snapshot)
+
+    p = sub.add_parser("stream", parents=[camera_args, duration_args, adaptive_args,
+                                                metrics_args],
+                       help="stream and log fps")
+    p.add_argument("--report-interval", type=float, default=1.0)
+    p.set_defaults(func=cmd_stream)
+
+    p = sub.add_parser("record", parents=[camera_args, duration_args, metrics_args],
+                       help="record to a video file")
+    p.add_argument("output")
+    p.add_argument("--codec", default="MJPG", help="four character code")
+    p.add_argument("--output-fps", type=float, help="playback fps of the written file")
+    p.add_argument("--stack", type=int, help="time-lapse: stack this many frames per output")
+    p.add_argument("--stack-interval", type=float,
+                   help="time-lapse: emit one stacked output every this many seconds")
+    p.add_argument("--stack-mode", choices=["mean", "ema"], default="mean")
+    p.add_argument("--stack-alpha", type=float, default=0.1, help="ema weight of a new frame")
+    p.set_defaults(func=cmd_record)
+
+    p = sub.add_parser("serve", parents=[camera_args, duration_args, adaptive_args,
+                                               metrics_args],
+                       help="serve the latest frame over HTTP")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8080)
+    p.set_defaults(func=cmd_serve)
+
+    p = sub.add_parser("bench", parents=[camera_args, duration_args],
+                       help="measure capture rate and jitter")
+    p.set_defaults(func=cmd_bench, duration=5.0)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except RuntimeError as e:
+        # e.g. the camera could not be opened; no traceback for expected failures
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
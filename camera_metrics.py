@@ -0,0 +1,191 @@
+# camera_metrics.py
+
+# Runtime health metrics for CameraAPI, CircularBuffer and consumers.
+# The hot paths only bump plain int attributes; values are read through
+# registered callables when /metrics is scraped or a snapshot is written.
+
+import json
+import os
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Event, Lock, Thread
+
+from camera_api_2 import Logger
+
+
+def _rss_bytes():
+    """Current resident set size; peak RSS where /proc is unavailable (macOS)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+# --- Metrics ---
+class Metrics:
+    """Registry of named counters/gauges evaluated only on collect()."""
+    def __init__(self):
+        self._metrics = {}
+        self.lock = Lock()
+
+    def add_counter(self, name, help, fn):
+        self._add(name, "counter", help, fn)
+
+    def add_gauge(self, name, help, fn):
+        self._add(name, "gauge", help, fn)
+
+    def _add(self, name, kind, help, fn):
+        with self.lock:
+            self._metrics[name] = (kind, help, fn)
+
+    def watch_camera(self, camera):
+        buffer = camera.get_buffer()
+        self.add_counter("camera_frames_captured_total", "Frames read from the camera.",
+                         lambda: camera.frames_captured)
+        self.add_counter("camera_read_failures_total", "Failed cap.read() calls.",
+                         lambda: camera.read_failures)
+        self.add_counter("camera_duplicate_frames_total", "Frames the backend delivered twice.",
+                         lambda: camera.duplicates)
+        self.add_gauge("camera_settings_revision", "Number of times settings were applied.",
+                       lambda: camera.settings.revision)
+        self.add_gauge("camera_buffer_depth", "Frames waiting in the buffer.",
+                       lambda: len(buffer))
+        self.add_gauge("camera_buffer_high_water", "Largest buffer depth seen.",
+                       lambda: buffer.high_water)
+        self.add_counter("camera_buffer_evictions_total", "Unread frames evicted from the buffer.",
+                         lambda: buffer.evicted)
+        # Age of the oldest unread frame keeps growing while a consumer is stalled
+        self.add_gauge("camera_consumer_lag_seconds", "Age of the oldest unread frame in the buffer.",
+                       buffer.oldest_age)
+        self.add_counter("camera_callback_dropped_total", "Frames dropped by busy callbacks.",
+                         lambda: sum(c["dropped"] for c in camera.callbacks.stats()))
+        self.add_counter("camera_callback_slow_total", "Callback calls over the frame budget.",
+                         lambda: sum(c["slow"] for c in camera.callbacks.stats()))
+
+    def watch_adaptive(self, controller):
+        self.add_gauge("camera_adaptive_level", "Current adaptive control level (0 = full rate).",
+                       lambda: controller.level)
+        self.add_counter("camera_adaptive_decisions_total", "Adaptive control level changes.",
+                         lambda: controller.decisions)
+
+    def watch_process(self):
+        self.add_counter("process_cpu_seconds_total", "User and system CPU time.",
+                         time.process_time)
+        self.add_gauge("process_resident_memory_bytes", "Resident memory size.",
+                       _rss_bytes)
+
+    def collect(self):
+        with self.lock:
+            items = list(self._metrics.items())
+        values = {}
+        for name, (kind, help, fn) in items:
+            try:
+                values[name] = fn()
+            except Exception:
+                # A consumer that went away must not break the scrape
+                continue
+        return values
+
+    def render_prometheus(self):
+        with self.lock:
+            info = dict(self._metrics)
+        lines = []
+        for name, value in self.collect().items():
+            kind, help, _ = info[name]
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# --- HTTP endpoint ---
+class MetricsServer:
+    """Serve /metrics (Prometheus text) and /metrics.json on a local port."""
+    def __init__(self, metrics, host="127.0.0.1", port=9100):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self.server = None
+        self.thread = None
+        self.log = Logger()
+
+    def start(self):
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body = metrics.render_prometheus().encode()
+                    content_type = "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body = json.dumps(metrics.collect()).encode()
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.thread = Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.log.info(f"Metrics at http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+            self.thread = None
+
+
+# --- JSON snapshot ---
+class SnapshotWriter:
+    """Periodically write a JSON snapshot of all metrics to path."""
+    def __init__(self, metrics, path, interval=10.0):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.thread = None
+        self.stop_event = Event()
+        self.log = Logger()
+
+    def start(self):
+        self.stop_event.clear()
+        self.thread = Thread(target=self._write_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        self.write()  # final snapshot on shutdown
+
+    def _write_loop(self):
+        while not self.stop_event.wait(self.interval):
+            self.write()
+
+    def write(self):
+        snapshot = {"timestamp": time.time(), "metrics": self.metrics.collect()}
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.path)  # readers never see a partial file
+        except OSError as e:
+            self.log.error(f"Failed to write metrics snapshot: {e}")
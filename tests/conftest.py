@@ -0,0 +1,75 @@
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import camera_api_2  # noqa: E402
+
+
+class FakeCap:
+    """Stand-in for cv2.VideoCapture that serves synthetic frames.
+
+    Each new frame takes `delay` seconds; a driver duplicate (repeat > 1)
+    returns the previous frame again immediately. With pos_msec the backend
+    reports a CAP_PROP_POS_MSEC timestamp per new frame.
+    """
+    def __init__(self, shape=(8, 8, 3), delay=0.0, fail_first=0, repeat=1,
+                 constant=False, pos_msec=False):
+        self.shape = shape
+        self.delay = delay
+        self.fail_first = fail_first
+        self.repeat = repeat
+        self.constant = constant
+        self.pos_msec = pos_msec
+        self.reads = 0
+        self.index = -1
+        self.props = {}
+
+    def read(self):
+        self.reads += 1
+        if self.reads <= self.fail_first:
+            return False, None
+        index = (self.reads - self.fail_first - 1) // self.repeat
+        if index != self.index:
+            self.index = index
+            if self.delay:
+                time.sleep(self.delay)
+        value = 0 if self.constant else (index + 1) % 256
+        return True, np.full(self.shape, value, dtype=np.uint8)
+
+    def isOpened(self):
+        return True
+
+    def set(self, prop, value):
+        self.props[prop] = value
+        return True
+
+    def get(self, prop):
+        if self.pos_msec and prop == cv2.CAP_PROP_POS_MSEC:
+            return (self.index + 1) * 33.0
+        return 0
+
+    def getBackendName(self):
+        return "FAKE"
+
+    def release(self):
+        pass
+
+
+@pytest.fixture(scope="session", autouse=True)
+def logger(tmp_path_factory):
+    # Logger is a singleton; create it first so tests do not write ./log
+    return camera_api_2.Logger(log_file=str(tmp_path_factory.mktemp("log") / "test.log"))
+
+
+@pytest.fixture
+def camera():
+    cam = camera_api_2.CameraAPI(camera_api_2.CircularBuffer(max_size=8))
+    cam.cap = FakeCap()
+    yield cam
+    cam.close_camera()
@@ -0,0 +1,99 @@
+from camera_api_2 import AdaptiveController
+
+
+def make_controller(camera, **kwargs):
+    kwargs.setdefault("down_after", 2)
+    kwargs.setdefault("up_after", 3)
+    kwargs.setdefault("cooldown", 1)
+    controller = AdaptiveController(camera, **kwargs)
+    controller.levels = controller.default_levels(640, 480, 30)
+    return controller
+
+
+def test_steps_down_only_after_sustained_pressure(camera):
+    controller = make_controller(camera)
+    controller.step(fill=1.0, drop_rate=0.5, lag=0.0)
+    assert controller.level == 0
+    controller.step(fill=1.0, drop_rate=0.5, lag=0.0)
+    assert controller.level == 1
+    assert camera.settings.get("fps") == 15
+
+
+def test_cooldown_and_streak_reset_prevent_oscillation(camera):
+    controller = make_controller(camera)
+    controller.step(1.0, 0.5, 0.0)
+    controller.step(1.0, 0.5, 0.0)
+    assert controller.level == 1
+    controller.step(1.0, 0.5, 0.0)  # swallowed by the cooldown
+    controller.step(1.0, 0.5, 0.0)
+    assert controller.level == 1
+    # A neutral sample breaks the pressure streak
+    controller.step(0.5, 0.0, 0.0)
+    controller.step(1.0, 0.5, 0.0)
+    assert controller.level == 1
+
+
+def test_steps_up_only_after_sustained_headroom(camera):
+    controller = make_controller(camera)
+    controller.step(1.0, 0.5, 0.0)
+    controller.step(1.0, 0.5, 0.0)
+    controller.step(0.0, 0.0, 0.0)  # cooldown
+    controller.step(0.0, 0.0, 0.0)
+    controller.step(0.0, 0.0, 0.0)
+    assert controller.level == 1
+    controller.step(0.0, 0.0, 0.0)
+    assert controller.level == 0
+    assert controller.decisions == 2
+    assert [entry[3] for entry in controller.history] == ["pressure", "headroom"]
+
+
+def test_consumer_lag_alone_counts_as_pressure(camera):
+    controller = make_controller(camera, max_lag=0.5)
+    controller.step(fill=0.0, drop_rate=0.0, lag=2.0)
+    controller.step(fill=0.0, drop_rate=0.0, lag=2.0)
+    assert controller.level == 1
+
+
+def test_does_not_step_past_the_last_level(camera):
+    controller = make_controller(camera, cooldown=0)
+    for _ in range(20):
+        controller.step(1.0, 1.0, 0.0)
+    assert controller.level == len(controller.levels) - 1
+
+
+def test_start_reapplies_level_zero(camera):
+    controller = make_controller(camera, interval=60)
+    controller.step(1.0, 0.5, 0.0)
+    controller.step(1.0, 0.5, 0.0)
+    assert camera.settings.get("fps") == 15
+    controller.start()
+    controller.stop()
+    assert controller.level == 0
+    assert camera.settings.get("fps") == 30
+
+
+def test_restart_keeps_settings_the_user_changed(camera):
+    controller = AdaptiveController(camera, interval=60, down_after=1)
+    controller.start()
+    controller.stop()
+    controller.step(1.0, 0.5, 0.0)
+    assert camera.settings.get("fps") == 15
+    camera.settings.set("width", 1280)
+    camera.settings.set("fps", 60)
+    controller.start()
+    controller.stop()
+    assert camera.settings.get("width") == 1280
+    assert camera.settings.get("fps") == 60
+    # The default ladder is rebuilt from the new settings
+    assert controller.levels[0] == {"width": 1280, "height": 480, "fps": 60}
+
+
+def test_restart_without_degradation_leaves_settings_alone(camera):
+    controller = AdaptiveController(camera, interval=60)
+    controller.start()
+    controller.stop()
+    camera.settings.set("width", 1280)
+    controller.start()
+    controller.stop()
+    assert camera.settings.get("width") == 1280
+    assert controller.levels[0]["width"] == 1280
@@ -0,0 +1,77 @@
+import time
+
+import numpy as np
+import pytest
+
+from camera_api_2 import Burst, CameraAPI
+from conftest import FakeCap
+
+
+def make_burst(values, shape=(6, 6, 3)):
+    frames = np.stack([np.full(shape, v, dtype=np.uint8) for v in values])
+    return Burst(frames, np.arange(len(values), dtype=np.float64))
+
+
+def test_temporal_mean_and_median():
+    burst = make_burst([10, 20, 90])
+    assert (burst.temporal_mean() == 40).all()
+    assert (burst.temporal_median() == 20).all()
+    assert burst.temporal_mean().dtype == np.uint8
+
+
+def test_brightness_per_frame():
+    burst = make_burst([10, 20, 90])
+    assert np.allclose(burst.brightness(), [10, 20, 90])
+
+
+def test_sharpness_and_best_frame():
+    flat = np.full((6, 6, 3), 128, dtype=np.uint8)
+    checker = np.zeros((6, 6, 3), dtype=np.uint8)
+    checker[::2, ::2] = 255
+    checker[1::2, 1::2] = 255
+    burst = Burst(np.stack([flat, checker, flat]), np.zeros(3))
+    sharpness = burst.sharpness()
+    assert sharpness[0] == 0 and sharpness[1] > 0
+    index, frame = burst.best_frame()
+    assert index == 1
+    assert (frame == checker).all()
+    assert burst.best_frame("brightness")[0] == 0
+    with pytest.raises(ValueError):
+        burst.best_frame("contrast")
+
+
+def test_grayscale_bursts():
+    burst = make_burst([10, 30], shape=(6, 6))
+    assert np.allclose(burst.brightness(), [10, 30])
+    assert burst.sharpness().shape == (2,)
+    assert burst.temporal_mean().shape == (6, 6)
+
+
+def test_capture_requires_open_camera():
+    with pytest.raises(RuntimeError):
+        CameraAPI().capture_burst(3)
+
+
+def test_capture_fills_one_contiguous_block(camera):
+    camera.cap = FakeCap(delay=0.01)
+    burst = camera.capture_burst(5)
+    assert burst.frames.shape == (5, 8, 8, 3)
+    assert burst.frames.flags["C_CONTIGUOUS"]
+    assert [int(f[0, 0, 0]) for f in burst.frames] == [1, 2, 3, 4, 5]
+    intervals = np.diff(burst.timestamps)
+    assert (intervals > 0.005).all()
+
+
+def test_streaming_burst_uses_capture_times_and_skips_backlog(camera):
+    camera.cap = FakeCap(delay=0.01)
+    camera.start_streaming()
+    time.sleep(0.1)  # let a backlog build up
+    called = time.time()
+    burst = camera.capture_burst(5)
+    assert (burst.timestamps >= called - 0.005).all()
+    assert np.diff(burst.timestamps).mean() > 0.005
+
+    time.sleep(0.05)
+    called = time.time()
+    stale = camera.capture_burst(3, fresh=False)
+    assert stale.timestamps[0] < called - 0.02
@@ -0,0 +1,109 @@
+import time
+from threading import Event
+
+import pytest
+
+from camera_api_2 import CallbackRegistry
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return predicate()
+
+
+def test_busy_callback_drops_frames_instead_of_blocking():
+    registry = CallbackRegistry()
+    release = Event()
+    callback = registry.add(lambda frame, fps: release.wait(), mode="thread",
+                            max_in_flight=1, drop_if_busy=True)
+    start = time.perf_counter()
+    for _ in range(5):
+        registry.dispatch(None, 30.0)
+    assert time.perf_counter() - start < 0.5
+    assert callback.dropped == 4
+    release.set()
+    registry.shutdown()
+    assert callback.calls == 1
+
+
+def test_blocking_policy_waits_for_a_slot():
+    registry = CallbackRegistry()
+    callback = registry.add(lambda frame, fps: time.sleep(0.02), mode="pool",
+                            max_in_flight=1, drop_if_busy=False)
+    for _ in range(3):
+        registry.dispatch(None, 30.0)
+    registry.shutdown()
+    assert callback.calls == 3
+    assert callback.dropped == 0
+
+
+def test_errors_are_counted_not_raised():
+    registry = CallbackRegistry()
+
+    def bad(frame, fps):
+        raise ValueError("boom")
+
+    callback = registry.add(bad, mode="inline")
+    registry.dispatch(None, 30.0)
+    registry.dispatch(None, 30.0)
+    assert callback.errors == 2
+    assert callback.calls == 2
+
+
+def test_slow_calls_are_counted_against_the_frame_budget():
+    registry = CallbackRegistry()
+    registry.frame_budget = 0.001
+    callback = registry.add(lambda frame, fps: time.sleep(0.01), mode="inline")
+    registry.dispatch(None, 30.0)
+    assert callback.slow == 1
+    assert sum(callback.histogram) == 1
+
+
+def test_removed_callback_is_skipped_and_closed_on_shutdown():
+    registry = CallbackRegistry()
+    seen = []
+    callback = registry.add(lambda frame, fps: seen.append(fps), mode="thread")
+    registry.dispatch(None, 1.0)
+    assert wait_for(lambda: seen == [1.0])
+    executor = callback.executor
+    # A dispatch that already holds the old list must still be safe
+    stale = registry.callbacks
+    registry.remove(callback)
+    registry.callbacks = stale
+    registry.dispatch(None, 2.0)
+    registry.callbacks = []
+    assert seen == [1.0]
+    registry.shutdown()
+    assert registry.retired == []
+    with pytest.raises(RuntimeError):
+        executor.submit(print)
+
+
+def test_submit_to_shut_down_executor_counts_a_drop():
+    registry = CallbackRegistry()
+    callback = registry.add(lambda frame, fps: None, mode="thread")
+    registry.dispatch(None, 1.0)
+    callback.executor.shutdown(wait=True)
+    registry.dispatch(None, 2.0)
+    assert callback.dropped == 1
+    # The slot was released, so the next frame is not dropped as busy
+    assert callback.slots.acquire(blocking=False)
+
+
+def test_remove_by_bound_method(camera):
+    class Consumer:
+        def __init__(self):
+            self.frames = 0
+
+        def on_frame(self, frame, fps):
+            self.frames += 1
+
+    consumer = Consumer()
+    # Each attribute access creates a new bound method object
+    camera.add_callback(consumer.on_frame, mode="inline")
+    camera.remove_callback(consumer.on_frame)
+    assert camera.callbacks.callbacks == []
+    camera.callbacks.dispatch(None, 30.0)
+    assert consumer.frames == 0
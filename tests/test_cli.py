@@ -0,0 +1,99 @@
+import cv2
+import pytest
+
+import camera_framework
+from conftest import FakeCap
+
+
+class ClosedCap(FakeCap):
+    def isOpened(self):
+        return False
+
+
+@pytest.fixture
+def fake_cv2(monkeypatch):
+    """Route cv2.VideoCapture to FakeCap and keep pytest's signal handlers."""
+    caps = []
+
+    def video_capture(index):
+        cap = FakeCap(shape=(16, 24, 3), delay=0.002)
+        caps.append(cap)
+        return cap
+
+    monkeypatch.setattr(cv2, "VideoCapture", video_capture)
+    monkeypatch.setattr(camera_framework, "_install_signal_handlers", lambda stop_event: None)
+    return caps
+
+
+# --- Parser ---
+def test_parser_defaults():
+    args = camera_framework.build_parser().parse_args(["snapshot", "out.png"])
+    assert args.func is camera_framework.cmd_snapshot
+    assert args.warmup == 5
+    assert args.index == 0 and args.width is None
+
+
+def test_parser_bench_defaults_to_finite_duration():
+    args = camera_framework.build_parser().parse_args(["bench"])
+    assert args.duration == 5.0
+    assert args.dedup == "mark"
+
+
+def test_parser_rejects_negative_warmup(capsys):
+    with pytest.raises(SystemExit):
+        camera_framework.build_parser().parse_args(["snapshot", "out.png", "--warmup", "-1"])
+    assert "must be >= 0" in capsys.readouterr().err
+
+
+def test_parser_accepts_zero_warmup():
+    args = camera_framework.build_parser().parse_args(["snapshot", "out.png", "--warmup", "0"])
+    assert args.warmup == 0
+
+
+def test_parser_requires_command():
+    with pytest.raises(SystemExit):
+        camera_framework.build_parser().parse_args([])
+
+
+# --- Commands ---
+def test_probe_applies_requested_mode(fake_cv2, capsys):
+    assert camera_framework.main(["probe", "--width", "640", "--height", "480",
+                                  "--fps", "30"]) == 0
+    assert fake_cv2[0].props == {cv2.CAP_PROP_FRAME_WIDTH: 640,
+                                 cv2.CAP_PROP_FRAME_HEIGHT: 480,
+                                 cv2.CAP_PROP_FPS: 30.0}
+    assert "backend: FAKE" in capsys.readouterr().out
+
+
+def test_snapshot_writes_image(fake_cv2, tmp_path):
+    out = tmp_path / "frame.png"
+    assert camera_framework.main(["snapshot", str(out), "--warmup", "2"]) == 0
+    image = cv2.imread(str(out))
+    assert image.shape == (16, 24, 3)
+    assert fake_cv2[0].reads == 3
+
+
+def test_snapshot_zero_warmup(fake_cv2, tmp_path):
+    out = tmp_path / "frame.png"
+    assert camera_framework.main(["snapshot", str(out), "--warmup", "0"]) == 0
+    assert fake_cv2[0].reads == 1
+
+
+def test_stream_runs_for_duration(fake_cv2, tmp_path):
+    frame_log = tmp_path / "frames.csv"
+    assert camera_framework.main(["stream", "--duration", "0.2",
+                                  "--frame-log", str(frame_log)]) == 0
+    assert len(frame_log.read_text().splitlines()) > 1
+
+
+def test_bench_reports_rate(fake_cv2, capsys):
+    assert camera_framework.main(["bench", "--duration", "0.2"]) == 0
+    out = capsys.readouterr().out
+    assert "fps:" in out
+    assert "duplicates: 0" in out
+
+
+def test_main_reports_unopenable_camera(monkeypatch, capsys):
+    monkeypatch.setattr(cv2, "VideoCapture", lambda index: ClosedCap())
+    assert camera_framework.main(["snapshot", "out.png"]) == 1
+    assert "Failed to open camera" in capsys.readouterr().err
@@ -0,0 +1,69 @@
+import time
+
+import pytest
+
+from camera_api_2 import CameraAPI, CircularBuffer, FrameLog
+from conftest import FakeCap
+
+
+def run(cap, dedup, seconds=0.4, fps=30):
+    camera = CameraAPI(CircularBuffer(max_size=1000), dedup=dedup)
+    camera.settings.set("fps", fps)
+    camera.cap = cap
+    camera.start_streaming()
+    time.sleep(seconds)
+    camera.close_camera()
+    return camera
+
+
+def test_rejects_unknown_mode():
+    with pytest.raises(ValueError):
+        CameraAPI(dedup="maybe")
+
+
+def test_off_buffers_every_frame():
+    camera = run(FakeCap(delay=0.01, repeat=2), "off")
+    assert camera.duplicates == 0
+    assert len(camera.buffer) == camera.frames_captured
+
+
+def test_mark_flags_driver_repeats_but_buffers_them():
+    camera = run(FakeCap(delay=0.01, repeat=2), "mark")
+    rows = camera.frame_log.view()
+    flagged = (rows["flags"] & FrameLog.FLAG_DUPLICATE) != 0
+    assert camera.duplicates == flagged.sum()
+    assert abs(camera.duplicates - camera.frames_captured / 2) <= 1
+    assert len(camera.buffer) == camera.frames_captured
+
+
+def test_drop_keeps_repeats_out_of_the_buffer():
+    camera = run(FakeCap(delay=0.01, repeat=2), "drop")
+    assert camera.duplicates > 0
+    assert len(camera.buffer) == camera.frames_captured - camera.duplicates
+
+
+def test_static_scene_is_not_a_duplicate():
+    # Identical pixels arriving at the frame rate are real frames
+    camera = run(FakeCap(delay=0.04, constant=True), "drop", fps=30)
+    assert camera.frames_captured > 3
+    assert camera.duplicates == 0
+    assert len(camera.buffer) == camera.frames_captured
+
+
+def test_backend_timestamp_decides_over_pixels():
+    # Distinct timestamps win over identical pixels, even when reads are fast
+    camera = run(FakeCap(delay=0.001, constant=True, pos_msec=True), "mark")
+    assert camera.duplicates == 0
+    # Repeated timestamps are duplicates
+    camera = run(FakeCap(delay=0.01, repeat=3, pos_msec=True), "mark")
+    assert abs(camera.duplicates - camera.frames_captured * 2 / 3) <= 2
+
+
+def test_fps_counts_unique_frames_only():
+    camera = run(FakeCap(delay=0.02, repeat=2), "mark", seconds=0.6)
+    unique = camera.frame_log.fps(window=0.4)
+    raw = camera.frame_log.fps(window=0.4, unique=False)
+    assert raw == pytest.approx(2 * unique, rel=0.2)
+    fps_values = [camera.buffer.pop()[1] for _ in range(len(camera.buffer))]
+    # Buffered fps reflects the ~50 Hz unique rate, not the doubled read rate
+    assert max(fps_values[2:]) < 70
@@ -0,0 +1,66 @@
+import time
+
+import numpy as np
+
+from camera_api_2 import CameraAPI, CircularBuffer, FrameLog
+from conftest import FakeCap
+
+
+def fill(log, intervals, flags=None):
+    t = 0.0
+    for i, interval in enumerate(intervals):
+        t += interval
+        log.append(i + 1, t, 1000.0 + t, interval, 0, 0, 0.0, flags[i] if flags else 0)
+
+
+def test_ring_wraps_and_keeps_capture_order():
+    log = FrameLog(capacity=4)
+    fill(log, [0.01] * 6)
+    rows = log.view()
+    assert len(log) == 4
+    assert list(rows["seq"]) == [3, 4, 5, 6]
+
+
+def test_gaps_selects_long_intervals():
+    log = FrameLog(capacity=16)
+    fill(log, [0.01, 0.01, 0.08, 0.01, 0.2])
+    assert list(log.gaps(50)["seq"]) == [3, 5]
+
+
+def test_fps_over_window_skips_duplicates_by_default():
+    log = FrameLog(capacity=64)
+    flags = [FrameLog.FLAG_DUPLICATE if i % 2 else 0 for i in range(21)]
+    fill(log, [0.05] * 21, flags)
+    assert np.isclose(log.fps(window=1.0), 10.0)
+    assert np.isclose(log.fps(window=1.0, unique=False), 20.0)
+
+
+def test_retries_are_clamped_to_the_column():
+    log = FrameLog(capacity=4)
+    log.append(1, 0.0, 0.0, 0.0, 70000, 0, 0.0, 0)
+    assert log.view()["retries"][0] == FrameLog.MAX_RETRIES
+
+
+def test_csv_export_has_header_and_rows(tmp_path):
+    log = FrameLog(capacity=4)
+    fill(log, [0.01, 0.02])
+    path = tmp_path / "frames.csv"
+    log.to_csv(str(path))
+    lines = path.read_text().splitlines()
+    assert lines[0] == ",".join(FrameLog.DTYPE.names)
+    assert len(lines) == 3
+
+
+def test_long_read_stall_does_not_kill_capture():
+    camera = CameraAPI(CircularBuffer(max_size=4))
+    camera.cap = FakeCap(fail_first=70000)
+    camera.start_streaming()
+    try:
+        deadline = time.monotonic() + 10
+        while len(camera.frame_log) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert camera.thread.is_alive()
+        assert camera.frame_log.view()["retries"][0] == FrameLog.MAX_RETRIES
+    finally:
+        camera.close_camera()
+    assert not camera.streaming
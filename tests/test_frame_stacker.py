@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+import camera_api_2
+from camera_api_2 import FrameStacker
+
+
+def frame(value, shape=(2, 2, 3)):
+    return np.full(shape, value, dtype=np.uint8)
+
+
+def test_mean_emits_average_every_k_frames():
+    stacker = FrameStacker(every=3)
+    assert stacker.add(frame(10)) is None
+    assert stacker.add(frame(20)) is None
+    out = stacker.add(frame(60))
+    assert out.dtype == np.uint8
+    assert (out == 30).all()
+    # The next window starts from scratch
+    stacker.add(frame(100))
+    stacker.add(frame(100))
+    assert (stacker.add(frame(100)) == 100).all()
+    assert stacker.emitted == 2
+
+
+def test_output_does_not_alias_the_accumulator():
+    stacker = FrameStacker(every=1)
+    first = stacker.add(frame(10))
+    stacker.add(frame(200))
+    assert (first == 10).all()
+
+
+def test_ema_carries_state_across_outputs():
+    stacker = FrameStacker(every=2, mode="ema", alpha=0.5)
+    stacker.add(frame(0))
+    assert (stacker.add(frame(100)) == 50).all()
+    stacker.add(frame(100))
+    # 50 -> 75 -> 87.5, rounded
+    assert (stacker.add(frame(100)) == 88).all()
+
+
+def test_interval_emits_by_elapsed_time(monkeypatch):
+    clock = iter([0.0, 0.4, 1.0, 1.2])
+    monkeypatch.setattr(camera_api_2.time, "monotonic", lambda: next(clock))
+    stacker = FrameStacker(interval=1.0)
+    assert stacker.add(frame(10)) is None
+    assert stacker.add(frame(20)) is None
+    assert (stacker.add(frame(30)) == 20).all()
+    assert stacker.add(frame(40)) is None
+
+
+def test_shape_change_restarts_accumulation():
+    stacker = FrameStacker(every=2)
+    stacker.add(frame(10))
+    assert stacker.add(frame(50, shape=(4, 4, 3))) is None
+    assert stacker.add(frame(70, shape=(4, 4, 3))).shape == (4, 4, 3)
+
+
+def test_rejects_invalid_configuration():
+    with pytest.raises(ValueError):
+        FrameStacker()
+    with pytest.raises(ValueError):
+        FrameStacker(every=2, mode="median")
@@ -0,0 +1,104 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from camera_metrics import Metrics, MetricsServer, SnapshotWriter
+
+
+def _metrics():
+    metrics = Metrics()
+    metrics.add_counter("frames_total", "Frames seen.", lambda: 42)
+    metrics.add_gauge("depth", "Buffer depth.", lambda: 3)
+    return metrics
+
+
+def test_collect_evaluates_callables():
+    assert _metrics().collect() == {"frames_total": 42, "depth": 3}
+
+
+def test_collect_skips_failing_metric():
+    metrics = _metrics()
+    metrics.add_gauge("broken", "Always fails.", lambda: 1 / 0)
+    assert "broken" not in metrics.collect()
+    assert "broken" not in metrics.render_prometheus()
+
+
+def test_render_prometheus_format():
+    text = _metrics().render_prometheus()
+    assert text.endswith("\n")
+    lines = text.splitlines()
+    assert "# HELP frames_total Frames seen." in lines
+    assert "# TYPE frames_total counter" in lines
+    assert "frames_total 42" in lines
+    assert "# TYPE depth gauge" in lines
+    assert "depth 3" in lines
+
+
+def test_watch_camera_reads_live_values(camera):
+    metrics = Metrics()
+    metrics.watch_camera(camera)
+    camera.frames_captured = 7
+    camera.get_buffer().push("frame")
+    values = metrics.collect()
+    assert values["camera_frames_captured_total"] == 7
+    assert values["camera_buffer_depth"] == 1
+    assert values["camera_consumer_lag_seconds"] >= 0
+
+
+@pytest.fixture
+def server():
+    server = MetricsServer(_metrics(), port=0)
+    server.start()
+    yield server
+    server.stop()
+
+
+def _get(server, path):
+    host, port = server.server.server_address[:2]
+    with urllib.request.urlopen(f"http://{host}:{port}{path}", timeout=5) as resp:
+        return resp.headers.get("Content-Type"), resp.read().decode()
+
+
+def test_server_prometheus_endpoint(server):
+    content_type, body = _get(server, "/metrics")
+    assert content_type.startswith("text/plain")
+    assert "frames_total 42" in body.splitlines()
+
+
+def test_server_json_endpoint(server):
+    content_type, body = _get(server, "/metrics.json")
+    assert content_type == "application/json"
+    assert json.loads(body) == {"frames_total": 42, "depth": 3}
+
+
+def test_server_unknown_path(server):
+    with pytest.raises(urllib.error.HTTPError) as excinfo:
+        _get(server, "/nope")
+    assert excinfo.value.code == 404
+
+
+def test_server_stop_is_idempotent():
+    server = MetricsServer(_metrics(), port=0)
+    server.start()
+    server.stop()
+    server.stop()
+    assert server.server is None
+
+
+def test_snapshot_writer_writes_json(tmp_path):
+    path = tmp_path / "metrics.json"
+    writer = SnapshotWriter(_metrics(), str(path), interval=0.01)
+    writer.start()
+    writer.stop()
+    snapshot = json.loads(path.read_text())
+    assert snapshot["metrics"] == {"frames_total": 42, "depth": 3}
+    assert snapshot["timestamp"] > 0
+    assert not (tmp_path / "metrics.json.tmp").exists()
+
+
+def test_snapshot_writer_reports_unwritable_path(tmp_path):
+    writer = SnapshotWriter(_metrics(), str(tmp_path / "missing" / "metrics.json"))
+    writer.write()  # logged, not raised
+    assert not (tmp_path / "missing").exists()